@@ -244,6 +244,9 @@ def cli(
 
     if not long_stats:  # shorten the stat counts when not using --long-stats
         for repo in repos:
+            # keep the raw counts around for layouts that need exact numbers
+            repo["_stars_int"] = repo["stargazers_count"]
+            repo["_forks_int"] = repo["forks"]
             repo["stargazers_count"] = shorten_count(repo["stargazers_count"])
             repo["forks"] = shorten_count(repo["forks"])
             if "date_range" in repo.keys() and repo["date_range"]:
@@ -1,10 +1,14 @@
 """starcli.layouts"""
 
-import math
+import re
+from functools import lru_cache
 
 from rich.align import Align
-from rich.console import Console, group
+from rich.cells import cell_len, set_cell_size
+from rich.console import Console, Group, group
 from rich.rule import Rule
+from rich.segment import Segment, Segments
+from rich.style import Style
 from rich.table import Table
 from rich.text import Text
 from rich.panel import Panel
@@ -18,98 +22,266 @@ SYMBOL_MAP = {"stars": "★", "forks": "⎇"}
 # Block characters for the graph bars
 GRAPH_BLOCKS = "█"
 
-
+# Maximum width for the graph bars (in characters) and every bar up to it
+_MAX_BAR = 40
+_BARS = tuple(GRAPH_BLOCKS * i for i in range(_MAX_BAR + 1))
+
+# Matches counts as formatted by shorten_count, eg: "874", "90.3k"
+_COUNT_RE = re.compile(r"^(-?\d+(?:\.\d+)?)([kKmM]?)$")
+_COUNT_MULTIPLIERS = {"": 1, "k": 1000, "K": 1000, "m": 1000000, "M": 1000000}
+
+# Styles used for every row, parsed once up front
+_BLUE = Style(color="blue")
+_ITALIC_BLUE = Style(color="blue", italic=True)
+_CYAN = Style(color="cyan")
+_BOLD_CYAN = Style(color="cyan", bold=True)
+_BOLD_YELLOW = Style(color="yellow", bold=True)
+_BRIGHT_YELLOW = Style(color="bright_yellow")
+_BRIGHT_BLUE = Style(color="bright_blue")
+_ITALIC_MAGENTA = Style(color="magenta", italic=True)
+
+# Prototypes for Text fragments shared by every row, copy() them before use
+_NO_LANG = Text("no language", style="italic")
+_NO_DESC = Text("no description", style="italic")
+_STARS_PREFIX = Text(f"{SYMBOL_MAP['stars']} ", style=_BRIGHT_YELLOW)
+_FORKS_PREFIX = Text(f"{SYMBOL_MAP['forks']} ", style=_BRIGHT_BLUE)
+_DATE_RANGE_PREFIX = Text("(", style="reset")
+# Returned by format_date_range when there's no date_range, never mutate it
+_EMPTY_TEXT = Text("")
+
+
+@lru_cache(maxsize=2048)
 def shorten_count(number):
     """Shortens number"""
     if number < 1000:
         return str(number)
 
     number = int(number)
-    new_number = math.ceil(round(number / 100.0, 1)) * 100
+    # round up to the next hundred, dropping remainders under 5
+    # eg: 1487 -> 1500, 1405 -> 1500, 1404 -> 1400
+    new_number = (number + 95) // 100 * 100
 
     if new_number % 1000 == 0:
-        return str(new_number)[0] + "k"
-    if new_number < 1000:
-        # returns the same old integer if no changes were made
-        return str(number)
+        return f"{new_number // 1000}k"
     # returns a new string if the number was shortened
-    return str(new_number / 1000.0) + "k"
+    return f"{new_number / 1000:.1f}k"
 
 
+@lru_cache(maxsize=1024)
 def format_stats(stars, forks):
     """Formatted string of repo stats"""
-    stats = f"{stars}{SYMBOL_MAP['stars']} " if stars != "-1" else ""
-    stats += f"{forks}{SYMBOL_MAP['forks']} " if forks != "-1" else ""
-    return stats
+    parts = []
+    if stars != "-1":
+        parts.append(f"{stars}{SYMBOL_MAP['stars']} ")
+    if forks != "-1":
+        parts.append(f"{forks}{SYMBOL_MAP['forks']} ")
+    return "".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def _format_date_range_str(date_range):
+    """Cached date_range string with the stars symbol"""
+    return date_range.replace(" stars", SYMBOL_MAP["stars"])
 
 
 def format_date_range(date_range):
-    """Formatted and styled Text object of date_range period stars"""
+    """Formatted and styled Text object of date_range period stars
+
+    Without a date_range the same empty Text is returned every time, it is
+    shared between calls and must not be mutated (eg: with append()), use
+    Text.assemble() or copy() it to build on the result instead.
+    """
     if not date_range:
-        return Text("")
+        return _EMPTY_TEXT
     return (
-        Text("(", style="reset")
-        .append(
-            (date_range.replace(" stars", SYMBOL_MAP["stars"])), style="italic magenta"
-        )
+        _DATE_RANGE_PREFIX.copy()
+        .append(_format_date_range_str(date_range), style=_ITALIC_MAGENTA)
         .append(")")
     )
 
+
+@lru_cache(maxsize=4096)
+def _link_style(url, color=""):
+    """Cached style string linking to url"""
+    return f"{color} link {url}" if color else f"link {url}"
+
+
+@lru_cache(maxsize=None)
+def _parse_count(count):
+    """Converts a formatted star/fork count back to an integer"""
+    if count == "-1":
+        return 0
+    if isinstance(count, int):
+        return count
+    match = _COUNT_RE.match(count)
+    if match is None:
+        return int(count)
+    number, suffix = match.groups()
+    if not suffix:
+        return int(number)
+    # Convert "90.3k" to 90300
+    return int(float(number) * _COUNT_MULTIPLIERS[suffix])
+
+
+def _bar_widths(stars_count, forks_count, max_stars):
+    """Widths of the star and fork bars, scaled against max_stars"""
+    if max_stars <= 0:
+        return 0, 0
+    # missing counts are -1, which shouldn't draw a bar
+    stars_bar_width = max(0, int((stars_count / max_stars) * _MAX_BAR))
+    # forks are scaled against stars too and may outgrow the bar
+    forks_bar_width = min(max(0, int((forks_count / max_stars) * _MAX_BAR)), _MAX_BAR)
+    return stars_bar_width, forks_bar_width
+
+
+def _pad(text, width):
+    """Pads text with spaces to fill width terminal cells"""
+    return text + " " * (width - cell_len(text))
+
+
+def _graph_segments(repos, stars_counts, forks_counts, max_stars):
+    """Preformatted segments of the graph layout, one line at a time
+
+    Looks the same as the rich table in graph_layout, but skips measuring
+    and laying out every cell. Returns None if the graph doesn't fit in the
+    console, so the table can wrap it instead.
+    """
+    bars_width = _MAX_BAR + 10
+
+    rows = [None] * len(repos)
+    name_width = stats_width = 0
+    for i, repo in enumerate(repos):
+        name, url, stars, forks, date_range = (
+            repo["name"],
+            repo["html_url"],
+            repo["stargazers_count"],
+            repo["forks"],
+            repo.get("date_range"),
+        )
+        stats = format_stats(stars, forks)
+        date_range = _format_date_range_str(date_range) if date_range else ""
+        stars_bar_width, forks_bar_width = _bar_widths(
+            stars_counts[i], forks_counts[i], max_stars
+        )
+        stars_label = f"{SYMBOL_MAP['stars']} {_BARS[stars_bar_width]} {stars}"
+        forks_label = f" {forks}"
+        forks_bar = f"{SYMBOL_MAP['forks']} {_BARS[forks_bar_width]}"
+        if max(cell_len(stars_label), cell_len(forks_bar + forks_label)) > bars_width:
+            return None
+
+        name_width = max(name_width, cell_len(name))
+        # date_range is shown in parentheses
+        stats_width = max(
+            stats_width, cell_len(stats), cell_len(date_range) + 2 if date_range else 0
+        )
+        rows[i] = (name, url, stats, date_range, stars_label, forks_bar, forks_label)
+
+    # every column is padded by one space on each side
+    if name_width + stats_width + bars_width + 6 > console.width:
+        return None
+
+    blank_name = Segment(" " * (name_width + 3))
+    segments = []
+    for name, url, stats, date_range, stars_label, forks_bar, forks_label in rows:
+        segments += [
+            Segment(" "),
+            Segment(name, _BOLD_YELLOW + Style(link=url)),
+            Segment(" " * (name_width - cell_len(name) + 2)),
+            Segment(_pad(stats, stats_width), _ITALIC_BLUE),
+            Segment("  "),
+            Segment(_pad(stars_label, bars_width), _BRIGHT_YELLOW),
+            Segment(" "),
+            Segment.line(),
+            blank_name,
+        ]
+        if date_range:
+            segments += [
+                Segment("("),
+                Segment(date_range, _ITALIC_MAGENTA),
+                Segment(_pad(")", stats_width - cell_len(date_range) - 1)),
+            ]
+        else:
+            segments.append(Segment(" " * stats_width))
+        segments += [
+            Segment("  "),
+            Segment(forks_bar, _BRIGHT_BLUE),
+            Segment(
+                _pad(forks_label, bars_width - cell_len(forks_bar)), _BRIGHT_YELLOW
+            ),
+            Segment(" "),
+            Segment.line(),
+        ]
+    return segments
+
+
 def graph_layout(repos):
     """Displays repositories in a graph format using rich"""
     
-    # Convert formatted star/fork counts to integers for calculation
-    def parse_count(count_str):
-        if count_str == "-1":
-            return 0
-        # Handle shortened counts like "90.3k"
-        if isinstance(count_str, str) and 'k' in count_str.lower():
-            # Convert "90.3k" to 90300
-            return int(float(count_str.lower().replace('k', '')) * 1000)
-        return int(count_str)
-    
-    # Find the maximum star count for scaling
-    max_stars = max(parse_count(repo["stargazers_count"]) for repo in repos)
-    max_forks = max(parse_count(repo["forks"]) for repo in repos)
-    
-    # Maximum width for the bar (in characters)
-    max_bar_width = 40
+    # Get every count once up front, finding the maximum star count
+    # for scaling in the same pass. Repos may carry their raw counts in
+    # "_stars_int" and "_forks_int" when the displayed ones are shortened,
+    # otherwise the displayed counts are parsed back
+    stars_counts = [0] * len(repos)
+    forks_counts = [0] * len(repos)
+    max_stars = 0
+    for i, repo in enumerate(repos):
+        stars_count = repo.get("_stars_int")
+        if stars_count is None:
+            stars_count = _parse_count(repo["stargazers_count"])
+        forks_count = repo.get("_forks_int")
+        if forks_count is None:
+            forks_count = _parse_count(repo["forks"])
+        stars_counts[i] = stars_count
+        forks_counts[i] = forks_count
+        if stars_count > max_stars:
+            max_stars = stars_count
+
+    # on a terminal, print preformatted lines when they fit
+    if console.is_terminal:
+        segments = _graph_segments(repos, stars_counts, forks_counts, max_stars)
+        if segments is not None:
+            console.print(Segments(segments))
+            return
     
     table = Table(show_header=False, box=None, padding=(0, 1))
     table.add_column("Repo", style="bold yellow", no_wrap=True)
     table.add_column("Stats")
-    table.add_column("Bars", width=max_bar_width + 10)
+    table.add_column("Bars", width=_MAX_BAR + 10)
     
-    for repo in repos:
-        name = Text(repo["name"], overflow="fold")
-        name.stylize(f"yellow link {repo['html_url']}")
-        
-        stats = format_stats(repo["stargazers_count"], repo["forks"])
-        date_range_col = format_date_range(repo.get("date_range"))
-        stats_text = Text(stats, style="italic blue")
-        if date_range_col:
-            stats_text.append("\n")
-            stats_text.append(date_range_col)
+    for i, repo in enumerate(repos):
+        name, url, stars, forks, date_range = (
+            repo["name"],
+            repo["html_url"],
+            repo["stargazers_count"],
+            repo["forks"],
+            repo.get("date_range"),
+        )
+        name = Text(name, overflow="fold")
+        name.stylize(_link_style(url, "yellow"))
         
-        # Create bar graphs for stars and forks
-        stars_count = parse_count(repo["stargazers_count"])
-        forks_count = parse_count(repo["forks"])
+        stats = format_stats(stars, forks)
+        date_range_col = format_date_range(date_range)
+        stats_text = (
+            Text.assemble(stats, "\n", date_range_col, style=_ITALIC_BLUE)
+            if date_range_col is not _EMPTY_TEXT
+            else Text(stats, style=_ITALIC_BLUE)
+        )
         
         # Scale the bars
-        stars_bar_width = int((stars_count / max_stars) * max_bar_width) if max_stars > 0 else 0
-        forks_bar_width = int((forks_count / max_stars) * max_bar_width) if max_stars > 0 else 0
-        
-        # Create the bars
-        stars_bar = Text(GRAPH_BLOCKS * stars_bar_width, style="bright_yellow")
-        forks_bar = Text(GRAPH_BLOCKS * forks_bar_width, style="bright_blue")
+        stars_bar_width, forks_bar_width = _bar_widths(
+            stars_counts[i], forks_counts[i], max_stars
+        )
         
-        # Add labels
-        bars = Text(f"{SYMBOL_MAP['stars']} ", style="bright_yellow")
-        bars.append(stars_bar)
-        bars.append(f" {repo['stargazers_count']}\n")
-        bars.append(f"{SYMBOL_MAP['forks']} ", style="bright_blue")
-        bars.append(forks_bar)
-        bars.append(f" {repo['forks']}")
+        # Create the labelled bars
+        bars = Text.assemble(
+            _STARS_PREFIX,
+            (_BARS[stars_bar_width], _BRIGHT_YELLOW),
+            f" {stars}\n",
+            _FORKS_PREFIX,
+            (_BARS[forks_bar_width], _BRIGHT_BLUE),
+            f" {forks}",
+            style=_BRIGHT_YELLOW,
+        )
         
         table.add_row(name, stats_text, bars)
     
@@ -123,18 +295,27 @@ def list_layout(repos):
     @group()
     def render_repo(repo):
         """Yields renderables for a single repo."""
-        yield Rule(style="bright_yellow")
+        yield Rule(style=_BRIGHT_YELLOW)
         yield ""
+        full_name, url, stars, forks, description, language, date_range = (
+            repo["full_name"],
+            repo["html_url"],
+            repo["stargazers_count"],
+            repo["forks"],
+            repo.get("description"),
+            repo.get("language"),
+            repo.get("date_range"),
+        )
         # Table with description and stats
         title_table = Table.grid(padding=(0, 1))
         title_table.expand = True
-        title = Text(repo["full_name"], overflow="fold")
-        title.stylize(f"yellow link {repo['html_url']}")
+        title = Text(full_name, overflow="fold")
+        title.stylize(_link_style(url, "yellow"))
 
-        stats = format_stats(repo["stargazers_count"], repo["forks"])
-        date_range_col = format_date_range(repo.get("date_range"))
+        stats = format_stats(stars, forks)
+        date_range_col = format_date_range(date_range)
 
-        title_table.add_row(title, Text(stats, style="italic blue"))
+        title_table.add_row(title, Text(stats, style=_ITALIC_BLUE))
         title_table.columns[1].no_wrap = True
         title_table.columns[1].justify = "right"
         yield title_table
@@ -142,8 +323,8 @@ def list_layout(repos):
         lang_table = Table.grid(padding=(0, 1))
         lang_table.expand = True
         language_col = (
-            Text(repo["language"], style="bold cyan")
-            if repo["language"]
+            Text(language, style=_BOLD_CYAN)
+            if language
             else Text("no language")
         )
         lang_table.add_row(language_col, date_range_col)
@@ -151,7 +332,6 @@ def list_layout(repos):
         yield lang_table
         yield ""
         # Description
-        description = repo["description"]
         if description:
             yield Text(description.strip())
         else:
@@ -162,9 +342,13 @@ def list_layout(repos):
         """Constrain width and align to center to create a column."""
         return Align.center(renderable, width=width, pad=False)
 
-    for repo in repos:
-        console.print(column(render_repo(repo)))
-    console.print(column(Rule(style="bright_yellow")))
+    # print everything in one go rather than once per repo
+    console.print(
+        Group(
+            *(column(render_repo(repo)) for repo in repos),
+            column(Rule(style="bright_yellow")),
+        )
+    )
 
 
 def table_layout(repos):
@@ -178,85 +362,117 @@ def table_layout(repos):
     table.add_column("Stats", justify="right")
 
     for repo in repos:
-        stats = Text(
-            format_stats(repo["stargazers_count"], repo["forks"]), style="blue"
+        name, url, stars, forks, description, language, date_range = (
+            repo["name"],
+            repo["html_url"],
+            repo["stargazers_count"],
+            repo["forks"],
+            repo.get("description"),
+            repo.get("language"),
+            repo.get("date_range"),
+        )
+        stats = Text.assemble(
+            format_stats(stars, forks),
+            "\n",
+            format_date_range(date_range),
+            style=_BLUE,
         )
-        stats.append("\n").append(format_date_range(repo.get("date_range")))
 
         language = (
-            Text(repo["language"], style="cyan")
-            if repo["language"]
-            else Text("no language", style="italic")
+            Text(language, style=_CYAN)
+            if language
+            else _NO_LANG.copy()
         )
         description = (
-            Text(repo["description"])
-            if repo["description"]
-            else Text("no description", style="italic")
+            Text(description)
+            if description
+            else _NO_DESC.copy()
         )
 
-        name = Text(repo["name"], overflow="fold")
-        name.stylize(f"yellow link {repo['html_url']}")
+        name = Text(name, overflow="fold")
+        name.stylize(_link_style(url, "yellow"))
 
         table.add_row(name, language, description, stats)
 
     console.print(table)
 
 
-def grid_layout(repos):
-    """Displays repositories in a grid format using rich"""
+def _build_panel(repo):
+    """Panel summarising a single repo for the grid layout"""
 
     max_desc_len = 90
 
-    panels = []
-    for repo in repos:
+    name, url, stars, forks, description, language, date_range = (
+        repo["name"],
+        repo["html_url"],
+        repo["stargazers_count"],
+        repo["forks"],
+        repo.get("description"),
+        repo.get("language"),
+        repo.get("date_range"),
+    )
 
-        stats = format_stats(repo["stargazers_count"], repo["forks"])
-        # '\n' added here as it would group both text and new line together
-        # hence if date_range isn't present the new line will also not be displayed
-        date_range = format_date_range(repo.get("date_range")).append("\n")
+    stats = format_stats(stars, forks)
+    date_range = format_date_range(date_range)
 
-        language = (
-            Text(repo["language"], style="cyan")
-            if repo["language"]
-            else Text("no language", style="italic")
-        )
-        description = (
-            Text(repo["description"])
-            if repo["description"]
-            else Text("no description", style="italic")
-        )
+    language = (
+        Text(language, style=_CYAN)
+        if language
+        else _NO_LANG.copy()
+    )
+    # truncate rest of the description if
+    # it's more than 90 (max_desc_len) cells wide
+    # measuring cells rather than chars also takes care of
+    # asian characters and zero width combining marks
+    if description and cell_len(description) > max_desc_len:
+        description = set_cell_size(description, max_desc_len - 1) + "…"
+    description = Text(description) if description else _NO_DESC.copy()
+
+    name = Text(name, style=_BOLD_YELLOW)
+    name.stylize(_link_style(url))
+    stats = Text(stats, style=_BLUE)
+
+    repo_summary = Text.assemble(
+        name,
+        "\n",
+        stats,
+        " ",
+        date_range,
+        "\n",
+        language,
+        "\n",
+        description,
+    )
+    return Panel(repo_summary, expand=True)
 
-        name = Text(repo["name"], style="bold yellow")
-        name.stylize(f"link {repo['html_url']}")
-        stats = Text(stats, style="blue")
 
-        # truncate rest of the description if
-        # it's more than 90 (max_desc_len) chars
-        # using truncate() is better than textwrap
-        # because it also takes care of asian characters
-        description.truncate(max_desc_len, overflow="ellipsis")
+def grid_layout(repos):
+    """Displays repositories in a grid format using rich"""
 
-        repo_summary = Text.assemble(
-            name,
-            "\n",
-            stats,
-            " ",
-            date_range,
-            language,
-            "\n",
-            description,
-        )
-        panels.append(Panel(repo_summary, expand=True))
+    panels = [None] * len(repos)
+    for i, repo in enumerate(repos):
+        panels[i] = _build_panel(repo)
 
     console.print((Columns(panels, width=30, expand=True)))
 
 
+_LAYOUTS = {"table": table_layout, "grid": grid_layout, "graph": graph_layout}
+
+
 def print_results(*args, page=False, layout=""):
     """Use a specified layout to print or page the fetched results"""
     if page:
         with console.pager():
             print_layout(layout=layout, *args)
         return
+    if not console.is_terminal:
+        # render everything first and write it out in a single block
+        # when the output is piped or redirected
+        with console.capture() as capture:
+            print_layout(layout=layout, *args)
+        console.file.write(capture.get())
+        console.file.flush()
+        return
     print_layout(
         layout=layout,
         *args,
@@ -265,11 +481,4 @@ def print_results(*args, page=False, layout=""):
 
 def print_layout(*args, layout="list"):
     """Use specified layout"""
-    if layout == "table":
-        table_layout(*args)
-    elif layout == "grid":
-        grid_layout(*args)
-    elif layout == "graph":
-        graph_layout(*args)
-    else:
-        list_layout(*args)
+    _LAYOUTS.get(layout, list_layout)(*args)
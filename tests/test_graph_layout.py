@@ -0,0 +1,99 @@
+"""tests.test_graph_layout"""
+import io
+import re
+
+from rich.console import Console
+
+from starcli import layouts
+from starcli.layouts import GRAPH_BLOCKS, _graph_segments, graph_layout
+
+
+def make_repo(name, stars, forks):
+    """Repo dict as passed to the layouts after shortening the counts"""
+    return {
+        "name": name,
+        "html_url": f"https://github.com/starcli/{name}",
+        "stargazers_count": str(stars),
+        "forks": str(forks),
+        "_stars_int": stars,
+        "_forks_int": forks,
+    }
+
+
+def render(repos, monkeypatch, **console_options):
+    """Render the graph layout and return its output"""
+    file = io.StringIO()
+    monkeypatch.setattr(layouts, "console", Console(file=file, **console_options))
+    graph_layout(repos)
+    return file.getvalue()
+
+
+def test_graph_missing_counts(monkeypatch):
+    """Test that missing (-1) counts don't draw a bar"""
+    repos = [make_repo("full", 10, -1), make_repo("empty", -1, 3)]
+    lines = render(repos, monkeypatch, width=120).splitlines()
+    full_stars, full_forks, empty_stars, empty_forks = lines
+    assert full_stars.count(GRAPH_BLOCKS) == 40
+    assert GRAPH_BLOCKS not in full_forks
+    assert GRAPH_BLOCKS not in empty_stars
+    assert empty_forks.count(GRAPH_BLOCKS) == 12
+
+
+def strip_escapes(output):
+    """Remove ANSI styles and hyperlinks from rendered output"""
+    output = re.sub(r"\x1b\]8;[^\x1b]*\x1b\\", "", output)
+    return re.sub(r"\x1b\[[0-9;]*m", "", output)
+
+
+REPOS = [
+    dict(make_repo("starcli", 90300, 5000), date_range="1.2k stars today"),
+    make_repo("中文项目", 874, -1),
+    dict(make_repo("gamma", 12500, 1100), date_range="300 stars this week"),
+]
+
+
+def test_graph_segments_match_table(monkeypatch):
+    """Test that the preformatted graph looks the same as the table"""
+    monkeypatch.setattr(layouts, "console", Console(width=120))
+    counts = [repo["_stars_int"] for repo in REPOS]
+    assert _graph_segments(REPOS, counts, [1, 1, 1], max(counts)) is not None
+
+    terminal = render(
+        REPOS, monkeypatch, width=120, force_terminal=True, color_system="256"
+    )
+    table = render(REPOS, monkeypatch, width=120, force_terminal=False)
+    assert "\x1b[" in terminal
+    assert strip_escapes(terminal) == table
+
+
+def test_graph_segments_fallback(monkeypatch):
+    """Test falling back to the table when the graph doesn't fit"""
+    stars_counts = [repo["_stars_int"] for repo in REPOS]
+    forks_counts = [repo["_forks_int"] for repo in REPOS]
+    max_stars = max(stars_counts)
+
+    # too narrow for the console
+    monkeypatch.setattr(layouts, "console", Console(width=70))
+    assert _graph_segments(REPOS, stars_counts, forks_counts, max_stars) is None
+    narrow = render(
+        REPOS, monkeypatch, width=70, force_terminal=True, color_system="256"
+    )
+    assert strip_escapes(narrow) == render(REPOS, monkeypatch, width=70)
+
+    # star count label overflowing the bars column
+    repos = [make_repo("long", 12345678, 1)]
+    monkeypatch.setattr(layouts, "console", Console(width=120))
+    assert _graph_segments(repos, [12345678], [1], 12345678) is None
+    overflow = render(
+        repos, monkeypatch, width=120, force_terminal=True, color_system="256"
+    )
+    assert strip_escapes(overflow) == render(repos, monkeypatch, width=120)
+
+
+def test_graph_console_options(monkeypatch):
+    """Test that quiet and recording consoles are respected"""
+    options = dict(width=120, force_terminal=True, color_system="256")
+    assert render(REPOS, monkeypatch, quiet=True, **options) == ""
+
+    render(REPOS, monkeypatch, record=True, **options)
+    assert "starcli" in layouts.console.export_text()
@@ -0,0 +1,55 @@
+"""tests.test_grid_layout"""
+import io
+
+from rich.cells import cell_len
+from rich.console import Console
+from rich.text import Text
+
+from starcli import layouts
+from starcli.layouts import _build_panel, grid_layout
+
+
+def test_grid_many_repos(monkeypatch):
+    """Test that large result sets are laid out as one unbroken grid"""
+    repos = [
+        {
+            "name": f"repo{i}",
+            "html_url": f"https://github.com/starcli/repo{i}",
+            "stargazers_count": "1k",
+            "forks": "10",
+            "language": "Python",
+            "description": "short",
+        }
+        for i in range(70)
+    ]
+    file = io.StringIO()
+    monkeypatch.setattr(layouts, "console", Console(file=file, width=100))
+    grid_layout(repos)
+
+    # 3 panels fit in each row and every panel is 6 lines tall,
+    # so 70 repos need 24 rows with only the last one partly filled
+    lines = file.getvalue().splitlines()
+    assert len(lines) == 24 * 6
+    assert all(line.count("╭") == 3 for line in lines[0:-6:6])
+    assert lines[-6].count("╭") == 1
+
+
+def test_grid_description_combining_marks():
+    """Test truncating descriptions with zero width combining marks"""
+    description = "हिन्दी विवरण " * 12
+    assert cell_len(description) > 90
+    repo = {
+        "name": "hindi",
+        "html_url": "https://github.com/starcli/hindi",
+        "stargazers_count": "1k",
+        "forks": "10",
+        "language": None,
+        "description": description,
+    }
+    expected = Text(description)
+    expected.truncate(90, overflow="ellipsis")
+
+    summary = _build_panel(repo).renderable.plain
+    assert summary.splitlines()[-1] == expected.plain
+    assert summary.endswith("…")
+    assert cell_len(summary.splitlines()[-1]) == 90
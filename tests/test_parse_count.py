@@ -0,0 +1,12 @@
+"""tests.test_parse_count"""
+from starcli.layouts import _parse_count
+
+
+def test_parse_count():
+    """Test converting formatted counts back to integers"""
+    assert _parse_count("-1") == 0
+    assert _parse_count("12") == 12
+    assert _parse_count("6k") == 6000
+    assert _parse_count("90.3k") == 90300
+    assert _parse_count("1.2M") == 1200000
+    assert _parse_count(1487) == 1487
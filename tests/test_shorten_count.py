@@ -8,3 +8,7 @@ def test_shorten_count():
     assert shorten_count(6001) == "6k"
     assert shorten_count(15587) == "15.6k"
     assert shorten_count(12) == "12"
+    assert shorten_count(1404) == "1.4k"
+    assert shorten_count(1405) == "1.5k"
+    assert shorten_count(15000) == "15k"
+    assert shorten_count(129960) == "130k"